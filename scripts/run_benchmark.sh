@@ -0,0 +1,30 @@
+#!/bin/bash
+# ============================================
+# run_benchmark.sh
+# 以合成資料量測 pipeline 各階段效能：載入 → 特徵工程 → 前處理 → fitness → 訓練 → 診斷 → 預測
+# 用法：bash ./scripts/run_benchmark.sh [small|medium|full] [其他 benchmark 參數...]
+# ============================================
+
+# 1. 切換到專案根目錄
+cd "$(dirname "$0")/.." || exit 1
+
+# 2. 建立 logs 目錄
+mkdir -p logs
+
+# 3. 執行 benchmark，並將輸出寫入 log 檔
+scale=${1:-small}
+shift
+timestamp=$(date +"%Y%m%d_%H%M%S")
+log_file="logs/benchmark_${scale}_$timestamp.log"
+
+echo "[INFO] 開始 benchmark (scale=$scale)，log 輸出到 $log_file"
+python -u tests/benchmark_pipeline.py --scale "$scale" "$@" 2>&1 | tee "$log_file"
+status=${PIPESTATUS[0]}
+
+# 4. 執行結果提示 (以 benchmark 的結束碼結束，讓 CI 能偵測失敗)
+if [ $status -eq 0 ]; then
+    echo "[INFO] Benchmark 執行完成 ✅，結果 JSON 位於 outputs/benchmarks/"
+else
+    echo "[ERROR] Benchmark 執行失敗 ❌，請檢查 $log_file"
+fi
+exit $status
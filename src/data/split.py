@@ -1,5 +1,25 @@
+import numpy as np
 from sklearn.model_selection import train_test_split
 
 def split_train_test(X, y, test_size=0.2, random_state=42):
     """切分訓練/測試資料"""
-    return train_test_split(X, y, test_size=test_size, stratify=y, random_state=random_state)
\ No newline at end of file
+    return train_test_split(X, y, test_size=test_size, stratify=y, random_state=random_state)
+
+def stratified_sample_index(y, n_samples, random_state=42):
+    """
+    分層抽樣（保留所有正樣本）：
+    - 正樣本 (label=1) 全數保留
+    - 剩餘名額從負樣本中隨機抽取
+    - n_samples 為 None 或大於資料筆數時，回傳全部 index
+    """
+    y = np.asarray(y)
+    n_total = len(y)
+    if n_samples is None or n_samples >= n_total:
+        return np.arange(n_total)
+
+    rng = np.random.default_rng(random_state)
+    pos_idx = np.flatnonzero(y == 1)
+    neg_idx = np.flatnonzero(y != 1)
+    n_neg = min(max(n_samples - len(pos_idx), 0), len(neg_idx))
+    neg_idx = rng.choice(neg_idx, size=n_neg, replace=False)
+    return np.sort(np.concatenate([pos_idx, neg_idx]))
@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pandas as pd
+
+'''
+合成 AML 資料產生器
+
+📌 用途
+比賽提供的 acct_transaction.csv / acct_alert.csv / acct_predict.csv 無法放到 CI 主機，
+因此以相同欄位格式產生合成資料，用於效能量測 (benchmark) 與流程測試。
+
+⚙️ 產生方式
+1. 帳戶：n_accounts 個帳戶，每個帳戶的活躍度服從 lognormal（少數帳戶交易特別多）。
+2. 一般交易：平均每個帳戶 txn_per_account 筆，金額服從 lognormal（重尾），日期與時間均勻分布。
+3. 人頭帳戶集團 (mule ring)：警示帳戶被分成數個集團，集團內以環狀方式互相轉帳，
+   - 金額集中在 45,000–49,999（規避大額申報門檻的小額切割）
+   - 多在夜間 (22:00–06:00) 且集中在少數幾天
+4. 類別比例：警示帳戶佔 alert_ratio；其中 predict_alert_fraction 比例不寫入 acct_alert.csv，
+   而是與一般帳戶一起放入 acct_predict.csv，作為待預測帳戶。
+'''
+
+def _account_ids(n_accounts: int, rng) -> np.ndarray:
+    """產生 64 字元十六進位帳戶代號（與比賽資料的雜湊帳號格式相同）"""
+    raw = rng.integers(0, 2**63, size=(n_accounts, 4), dtype=np.int64)
+    return np.array(["".join(f"{v:016x}" for v in row) for row in raw])
+
+def _format_time(seconds: np.ndarray) -> np.ndarray:
+    """將當日秒數轉為 HH:MM:SS 字串"""
+    return pd.to_datetime(seconds, unit="s").strftime("%H:%M:%S").to_numpy()
+
+def generate_synthetic_data(n_accounts: int = 10000, txn_per_account: float = 5.0, alert_ratio: float = 0.005,
+                            ring_size: int = 5, ring_txn_per_edge: int = 4, n_days: int = 120,
+                            predict_ratio: float = 0.05, predict_alert_fraction: float = 0.2,
+                            random_state: int = 42):
+    """
+    產生合成資料，回傳 (txn_df, alert_df, predict_df)，欄位格式與比賽資料相同：
+    - txn_df: from_acct, from_acct_type, to_acct, to_acct_type, is_self_txn, txn_amt,
+              txn_date, txn_time, currency_type, channel_type
+    - alert_df: acct, event_date
+    - predict_df: acct, label
+    """
+    rng = np.random.default_rng(random_state)
+    accounts = _account_ids(n_accounts, rng)
+
+    # (a) 一般交易
+    n_txn = int(n_accounts * txn_per_account)
+    activity = rng.lognormal(0, 1, n_accounts)
+    activity /= activity.sum()
+    from_idx = rng.choice(n_accounts, size=n_txn, p=activity)
+    to_idx = rng.integers(0, n_accounts, n_txn)
+    normal_amt = np.round(rng.lognormal(8, 1.5, n_txn))
+    normal_date = rng.integers(1, n_days + 1, n_txn)
+    normal_time = rng.integers(0, 86400, n_txn)
+
+    # (b) 人頭帳戶集團：警示帳戶以環狀方式互相轉帳
+    n_alert = max(int(round(n_accounts * alert_ratio)), ring_size)
+    alert_idx = rng.choice(n_accounts, size=n_alert, replace=False)
+    n_rings = n_alert // ring_size
+    rings = alert_idx[:n_rings * ring_size].reshape(n_rings, ring_size)
+    ring_from = np.repeat(rings.ravel(), ring_txn_per_edge)
+    ring_to = np.repeat(np.roll(rings, -1, axis=1).ravel(), ring_txn_per_edge)
+    n_ring_txn = len(ring_from)
+    ring_amt = rng.integers(45000, 50000, n_ring_txn).astype(float)
+    ring_start = np.repeat(rng.integers(1, max(n_days - 7, 1) + 1, n_rings), ring_size * ring_txn_per_edge)
+    ring_date = ring_start + rng.integers(0, 7, n_ring_txn)
+    ring_time = (rng.integers(22 * 3600, 30 * 3600, n_ring_txn)) % 86400
+
+    from_all = np.concatenate([from_idx, ring_from])
+    to_all = np.concatenate([to_idx, ring_to])
+    n_all = len(from_all)
+    txn_df = pd.DataFrame({
+        "from_acct": accounts[from_all],
+        "from_acct_type": np.where(rng.random(n_all) < 0.9, 1, 2),
+        "to_acct": accounts[to_all],
+        "to_acct_type": np.where(rng.random(n_all) < 0.9, 1, 2),
+        "is_self_txn": np.where(from_all == to_all, "Y", "N"),
+        "txn_amt": np.concatenate([normal_amt, ring_amt]),
+        "txn_date": np.concatenate([normal_date, ring_date]),
+        "txn_time": _format_time(np.concatenate([normal_time, ring_time])),
+        "currency_type": np.where(rng.random(n_all) < 0.95, "TWD", "USD"),
+        "channel_type": rng.integers(1, 8, n_all).astype(str),
+    })
+    txn_df = txn_df.sort_values(["txn_date", "txn_time"], kind="stable").reset_index(drop=True)
+
+    # (c) 警示帳戶與待預測帳戶
+    n_hidden = int(round(n_alert * predict_alert_fraction))
+    hidden_alert_idx, known_alert_idx = alert_idx[:n_hidden], alert_idx[n_hidden:]
+    alert_df = pd.DataFrame({
+        "acct": accounts[known_alert_idx],
+        "event_date": rng.integers(1, n_days + 1, len(known_alert_idx)),
+    })
+
+    normal_mask = np.ones(n_accounts, dtype=bool)
+    normal_mask[alert_idx] = False
+    n_predict_normal = min(int(round(n_accounts * predict_ratio)), int(normal_mask.sum()))
+    predict_normal_idx = rng.choice(np.flatnonzero(normal_mask), size=n_predict_normal, replace=False)
+    predict_idx = rng.permutation(np.concatenate([hidden_alert_idx, predict_normal_idx]))
+    predict_df = pd.DataFrame({"acct": accounts[predict_idx], "label": 0})
+
+    return txn_df, alert_df, predict_df
+
+def write_synthetic_data(output_dir: str, **kwargs):
+    """產生合成資料並輸出成 acct_transaction.csv / acct_alert.csv / acct_predict.csv，回傳三個檔案路徑"""
+    os.makedirs(output_dir, exist_ok=True)
+    txn_df, alert_df, predict_df = generate_synthetic_data(**kwargs)
+
+    paths = {
+        "acct_transaction_csv": os.path.join(output_dir, "acct_transaction.csv"),
+        "acct_alert_csv": os.path.join(output_dir, "acct_alert.csv"),
+        "acct_predict_csv": os.path.join(output_dir, "acct_predict.csv"),
+    }
+    txn_df.to_csv(paths["acct_transaction_csv"], index=False)
+    alert_df.to_csv(paths["acct_alert_csv"], index=False)
+    predict_df.to_csv(paths["acct_predict_csv"], index=False)
+    print(f"[INFO] 合成資料已輸出到 {output_dir} (交易 {len(txn_df)} 筆、警示 {len(alert_df)} 筆、待預測 {len(predict_df)} 筆)")
+    return paths
@@ -1,10 +1,10 @@
 import os
-import seaborn as sns
-import matplotlib.pyplot as plt
-import shap
 import numpy as np
 import pandas as pd
-from scipy.stats import ks_2samp
+from scipy.stats import ks_2samp, kstwo
+
+from data.split import stratified_sample_index
+from evaluation.feature_plots import render_all_feature_plots
 
 '''
 分布檢查（偏態係數）
@@ -59,66 +59,119 @@ SHAP 分析（排名）
 - 如果某個特徵 SHAP 排名很高，即使它的分布差異不大，也值得保留。
 '''
 
-def diagnose_features(X_train, X_test, y_train, y_test, model, output_dir: str, summary_csv: str):
+'''
+診斷模式（抽樣 + 平行繪圖）
+
+1. 統計量一次算完
+- 偏態係數、標籤中位數差異、KS 檢定皆以「整個 DataFrame」向量化計算，不再逐欄迴圈。
+- 統計量仍使用全部資料，CSV 總表欄位與原本完全相同。
+
+2. SHAP 與繪圖改用分層抽樣
+- 抽樣時保留所有正樣本（警示帳戶），其餘名額由負樣本隨機補齊。
+- shap_sample_size：SHAP 使用的樣本數；sample_size：繪圖使用的樣本數；None 表示使用全部資料。
+
+3. 繪圖平行化或略過
+- plot_workers > 1 時，以 process pool (spawn) 平行輸出每個特徵的三張圖（evaluation/feature_plots.py）。
+- worker 數量上限為 CPU 數與特徵數；只剩 1 個 worker 時直接依序繪圖，省去 process 啟動成本。
+- 使用抽樣資料繪圖時，標題會註明抽樣筆數（分層抽樣保留所有正樣本，正樣本比例高於原始資料）。
+- skip_plots=True 時完全不繪圖，只輸出文字報告與 CSV 總表。
+'''
+
+KS_MAX_EXACT_N = 10000  # 與 scipy ks_2samp(method="auto") 相同：樣本數不超過此值時使用 exact 模式
+
+def ks_2samp_columns(X_train: pd.DataFrame, X_test: pd.DataFrame) -> pd.Series:
+    """
+    對所有欄位同時做雙樣本 KS 檢定 (two-sided)，回傳每個欄位的 p-value。
+    - 大樣本：合併後沿 axis=0 排序一次，以累積計數求出所有欄位的 KS 統計量，再以漸近分布求 p-value
+    - 小樣本：與 scipy 相同改用 exact 模式，逐欄呼叫 ks_2samp
+    """
+    n1, n2 = len(X_train), len(X_test)
+    if max(n1, n2) <= KS_MAX_EXACT_N:
+        return pd.Series(
+            [ks_2samp(X_train[c], X_test[c]).pvalue for c in X_train.columns],
+            index=X_train.columns
+        )
+
+    data = np.concatenate([X_train.to_numpy(dtype=float), X_test.to_numpy(dtype=float)])
+    order = np.argsort(data, axis=0, kind="stable")
+    sorted_values = np.take_along_axis(data, order, axis=0)
+    from_train = order < n1
+    cdf_diff = np.cumsum(from_train, axis=0) / n1 - np.cumsum(~from_train, axis=0) / n2
+
+    # 相同數值只在最後一筆比較 CDF 差距
+    last_of_tie = np.ones(sorted_values.shape, dtype=bool)
+    last_of_tie[:-1] = sorted_values[1:] != sorted_values[:-1]
+    ks_stat = np.where(last_of_tie, np.abs(cdf_diff), 0.0).max(axis=0)
+
+    m, n = max(n1, n2), min(n1, n2)
+    en = m * n / (m + n)
+    pvalues = np.clip(kstwo.sf(ks_stat, np.round(en)), 0, 1)
+    return pd.Series(pvalues, index=X_train.columns)
+
+def compute_feature_statistics(X_train: pd.DataFrame, X_test: pd.DataFrame, y_train) -> pd.DataFrame:
+    """一次計算所有特徵的偏態係數、標籤中位數差異比例與 KS 檢定 p-value"""
+    skewness = X_train.skew()
+    medians = X_train.groupby(y_train).median().reindex([0, 1])
+    median_neg, median_pos = medians.loc[0], medians.loc[1]
+    median_diff_ratio = (median_pos - median_neg).abs() / (median_neg.abs() + 1e-6)
+    ks_pvalue = ks_2samp_columns(X_train, X_test)
+
+    return pd.DataFrame({
+        "skewness": skewness,
+        "median_diff_ratio": median_diff_ratio,
+        "ks_pvalue": ks_pvalue
+    })
+
+def diagnose_features(X_train, X_test, y_train, y_test, model, output_dir: str, summary_csv: str,
+                      sample_size=None, shap_sample_size=None, plot_workers: int = 1,
+                      skip_plots: bool = False, random_state: int = 42):
     """
     對所有特徵進行診斷：
     1. 輸出每個特徵的圖表與文字報告
     2. 彙整成一份 CSV 總表 (偏態係數、中位數差異、SHAP 排名、KS 檢定、建議)
+
+    - sample_size: 繪圖用的分層抽樣筆數（保留所有正樣本），None 表示全部
+    - shap_sample_size: SHAP 用的分層抽樣筆數（保留所有正樣本），None 表示全部
+    - plot_workers: 平行繪圖的 process 數量
+    - skip_plots: True 時略過所有圖表
     """
 
     os.makedirs(output_dir, exist_ok=True)
     results = []
 
-    # === SHAP 分析 (一次算完所有特徵) ===
+    # === SHAP 分析 (一次算完所有特徵，使用分層抽樣) ===
+    # shap 匯入約需數秒，延後到這裡才匯入，避免 spawn 繪圖 worker 重新匯入主程式時一併載入
+    import shap
+    shap_idx = stratified_sample_index(y_train, shap_sample_size, random_state=random_state)
     explainer = shap.TreeExplainer(model)
-    shap_values = explainer.shap_values(X_train)
+    shap_values = explainer.shap_values(X_train.iloc[shap_idx])
     mean_abs_shap = np.abs(shap_values).mean(axis=0)
     shap_ranking = mean_abs_shap.argsort()[::-1]
     feature_to_rank = {X_train.columns[i]: rank+1 for rank, i in enumerate(shap_ranking)}
 
+    # === 統計量 (向量化，一次算完所有特徵) ===
+    stats = compute_feature_statistics(X_train, X_test, y_train)
+
+    # === 圖表 (分層抽樣 + 平行繪圖) ===
+    if not skip_plots:
+        train_idx = stratified_sample_index(y_train, sample_size, random_state=random_state)
+        test_idx = stratified_sample_index(y_test, sample_size, random_state=random_state)
+        sample_note = ""
+        if len(train_idx) < len(X_train) or len(test_idx) < len(X_test):
+            sample_note = (f"stratified sample: train n={len(train_idx)}, test n={len(test_idx)}, "
+                           f"all positives kept")
+        render_all_feature_plots(
+            X_train.iloc[train_idx], X_test.iloc[test_idx], y_train.iloc[train_idx],
+            output_dir=output_dir, plot_workers=plot_workers, sample_note=sample_note
+        )
+
     for feature_name in X_train.columns:
-        # 1️⃣ 分布檢查（偏態係數）
-        skewness = X_train[feature_name].skew()
-        plt.figure(figsize=(8, 6))
-        sns.histplot(X_train[feature_name], bins=50, kde=True, color="steelblue")
-        plt.title(f"Distribution of {feature_name} (Train)")
-        plt.xlabel(feature_name)
-        plt.ylabel("Count")
-        plt.grid(True)
-        plt.savefig(os.path.join(output_dir, f"{feature_name}_distribution.png"))
-        plt.close()
-
-        # 2️⃣ 標籤分組視覺化（中位數差異）
-        median_pos = X_train.loc[y_train==1, feature_name].median()
-        median_neg = X_train.loc[y_train==0, feature_name].median()
-        median_diff_ratio = abs(median_pos - median_neg) / (abs(median_neg) + 1e-6)
-
-        plt.figure(figsize=(8, 6))
-        sns.boxplot(x=y_train, y=X_train[feature_name])
-        plt.title(f"{feature_name} vs Label (Train)")
-        plt.xlabel("Label")
-        plt.ylabel(feature_name)
-        plt.grid(True)
-        plt.savefig(os.path.join(output_dir, f"{feature_name}_boxplot.png"))
-        plt.close()
-
-        # 3️⃣ SHAP 排名
+        skewness = stats.at[feature_name, "skewness"]
+        median_diff_ratio = stats.at[feature_name, "median_diff_ratio"]
         feature_rank = feature_to_rank[feature_name]
+        ks_pvalue = stats.at[feature_name, "ks_pvalue"]
 
-        # 4️⃣ Train vs Test 分布比較（KS 檢定）
-        ks_stat, ks_pvalue = ks_2samp(X_train[feature_name], X_test[feature_name])
-        plt.figure(figsize=(8, 6))
-        sns.kdeplot(X_train[feature_name], label="Train", fill=True)
-        sns.kdeplot(X_test[feature_name], label="Test", fill=True)
-        plt.title(f"{feature_name} Distribution: Train vs Test")
-        plt.xlabel(feature_name)
-        plt.ylabel("Density")
-        plt.legend()
-        plt.grid(True)
-        plt.savefig(os.path.join(output_dir, f"{feature_name}_overfit_check.png"))
-        plt.close()
-
-        # 5️⃣ 自動報告判斷邏輯
+        # 自動報告判斷邏輯
         if abs(skewness) > 2:
             suggestion = "需轉換（建議 log transform 或標準化）; \n原因: skewness > 2"
         elif median_diff_ratio < 0.05 and feature_rank > 10:
@@ -130,7 +183,7 @@ def diagnose_features(X_train, X_test, y_train, y_test, model, output_dir: str,
         else:
             suggestion = "中性（可保留，但需觀察）"
 
-        # 6️⃣ 個別文字報告
+        # 個別文字報告
         report_lines = [
             "="*60,
             f"🔎 特徵診斷報告：{feature_name}",
@@ -148,7 +201,7 @@ def diagnose_features(X_train, X_test, y_train, y_test, model, output_dir: str,
         with open(report_path, "w", encoding="utf-8") as f:
             f.write("\n".join(report_lines))
 
-        # 7️⃣ 加入總表
+        # 加入總表
         results.append({
             "feature": feature_name,
             "skewness": round(skewness, 2),
@@ -165,4 +218,4 @@ def diagnose_features(X_train, X_test, y_train, y_test, model, output_dir: str,
     df_results.to_csv(summary_csv, index=False, encoding="utf-8-sig")
 
     print(f"[INFO] 特徵診斷總表已輸出到 {summary_csv}")
-    return df_results
\ No newline at end of file
+    return df_results
@@ -0,0 +1,76 @@
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import seaborn as sns
+import matplotlib.pyplot as plt
+
+'''
+特徵診斷圖表
+
+- 由 diagnose_feature.py 呼叫，輸出每個特徵的分布圖、標籤分組 boxplot 與 Train vs Test KDE。
+- 獨立成模組且不匯入 shap，平行繪圖時 spawn 出的 worker 只需載入繪圖相關套件。
+'''
+
+def render_feature_plots(feature_name, train_values, test_values, train_labels, output_dir: str, sample_note: str = ""):
+    """
+    輸出單一特徵的三張圖：分布、標籤分組 boxplot、Train vs Test KDE
+    - sample_note: 使用抽樣資料時附加在標題上的說明（分層抽樣會高估正樣本比例）
+    """
+    suffix = f"\n[{sample_note}]" if sample_note else ""
+    plt.switch_backend("Agg")
+
+    # 1️⃣ 分布檢查
+    plt.figure(figsize=(8, 6))
+    sns.histplot(train_values, bins=50, kde=True, color="steelblue")
+    plt.title(f"Distribution of {feature_name} (Train){suffix}")
+    plt.xlabel(feature_name)
+    plt.ylabel("Count")
+    plt.grid(True)
+    plt.savefig(os.path.join(output_dir, f"{feature_name}_distribution.png"))
+    plt.close()
+
+    # 2️⃣ 標籤分組視覺化
+    plt.figure(figsize=(8, 6))
+    sns.boxplot(x=train_labels, y=train_values)
+    plt.title(f"{feature_name} vs Label (Train){suffix}")
+    plt.xlabel("Label")
+    plt.ylabel(feature_name)
+    plt.grid(True)
+    plt.savefig(os.path.join(output_dir, f"{feature_name}_boxplot.png"))
+    plt.close()
+
+    # 3️⃣ Train vs Test 分布比較
+    plt.figure(figsize=(8, 6))
+    sns.kdeplot(train_values, label="Train", fill=True)
+    sns.kdeplot(test_values, label="Test", fill=True)
+    plt.title(f"{feature_name} Distribution: Train vs Test{suffix}")
+    plt.xlabel(feature_name)
+    plt.ylabel("Density")
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(os.path.join(output_dir, f"{feature_name}_overfit_check.png"))
+    plt.close()
+    return feature_name
+
+def render_all_feature_plots(X_train, X_test, y_train, output_dir: str, plot_workers: int = 1, sample_note: str = ""):
+    """
+    輸出所有特徵的圖表：
+    - 實際 worker 數 = min(plot_workers, CPU 數, 特徵數)；為 1 時依序繪圖
+    - 否則以 process pool (spawn) 平行繪圖；不使用 fork，避免複製 XGBoost 執行緒狀態造成 deadlock
+    """
+    tasks = [
+        (feature_name, X_train[feature_name], X_test[feature_name], y_train, output_dir, sample_note)
+        for feature_name in X_train.columns
+    ]
+
+    # 每個 worker 需重新匯入 seaborn / matplotlib，worker 數量不超過 CPU 數與特徵數
+    max_workers = min(plot_workers, os.cpu_count() or 1, len(tasks))
+    if max_workers <= 1:
+        for task in tasks:
+            render_feature_plots(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context("spawn")) as executor:
+        futures = [executor.submit(render_feature_plots, *task) for task in tasks]
+        for future in futures:
+            future.result()
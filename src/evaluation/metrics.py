@@ -1,21 +1,93 @@
-from sklearn.metrics import classification_report, roc_auc_score, f1_score, precision_score, recall_score
+from sklearn.metrics import classification_report
 import numpy as np
 
-def evaluate_model(model, X_test, y_test):
-    """輸出 classification report 與 AUC"""
-    y_pred = model.predict(X_test)
+'''
+排序一次的評估指標
+
+- 將分數由大到小排序一次，在每個「相異分數」處累積 TP / FP 數量。
+- 以 threshold = 該分數 (y_proba >= threshold 判為正樣本)，即可得到完整的 precision / recall / F1 曲線。
+- AUC、PR-AUC (average precision)、precision@k / recall@k 與 F1 最佳 threshold 皆由同一份累積計數導出，
+  整體複雜度為 O(n log n)，不需要對每個 threshold 重新計算。
+'''
+
+def compute_score_curve(y_true, y_score):
+    """
+    依分數排序一次，回傳：
+    - thresholds: 由大到小的相異分數
+    - tps / fps: 分數 >= threshold 時的 TP / FP 數量
+    - y_sorted: 依分數由大到小排序後的標籤 (供 precision@k 使用)
+    """
+    y_true = np.asarray(y_true) == 1
+    y_score = np.asarray(y_score, dtype=float)
+
+    order = np.argsort(-y_score, kind="stable")
+    y_score = y_score[order]
+    y_sorted = y_true[order]
+
+    # 每個相異分數的最後一筆位置
+    threshold_idx = np.r_[np.flatnonzero(np.diff(y_score)), len(y_score) - 1]
+    tps = np.cumsum(y_sorted)[threshold_idx]
+    fps = threshold_idx + 1 - tps
+    return y_score[threshold_idx], tps, fps, y_sorted
+
+def evaluate_scores(y_true, y_score, k_list=(100, 500, 1000)):
+    """
+    由單次排序計算所有評估指標：
+    auc, pr_auc, best_threshold, best_f1, precision@k, recall@k
+    """
+    thresholds, tps, fps, y_sorted = compute_score_curve(y_true, y_score)
+    n_pos, n_neg = tps[-1], fps[-1]
+
+    # ROC AUC (梯形法)
+    if n_pos > 0 and n_neg > 0:
+        tpr = np.r_[0, tps / n_pos]
+        fpr = np.r_[0, fps / n_neg]
+        auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+    else:
+        auc = float("nan")
+
+    # PR 曲線與 F1
+    precision = tps / (tps + fps)
+    recall = tps / n_pos if n_pos > 0 else np.zeros_like(precision, dtype=float)
+    pr_auc = float(np.sum(np.diff(np.r_[0, recall]) * precision)) if n_pos > 0 else float("nan")
+    f1 = 2 * tps / (tps + fps + n_pos)
+    best = int(np.argmax(f1))
+
+    results = {
+        "auc": auc,
+        "pr_auc": pr_auc,
+        "best_threshold": float(thresholds[best]),
+        "best_f1": float(f1[best]),
+    }
+
+    # precision@k / recall@k
+    cum_pos = np.cumsum(y_sorted)
+    for k in k_list:
+        k_eff = min(k, len(y_sorted))
+        hits = cum_pos[k_eff - 1] if k_eff > 0 else 0
+        results[f"precision@{k}"] = float(hits / k_eff) if k_eff > 0 else float("nan")
+        results[f"recall@{k}"] = float(hits / n_pos) if n_pos > 0 else float("nan")
+    return results
+
+def make_curve_scorer(metric: str = "auc"):
+    """建立可用於 cross_val_score(scoring=...) 的快速評分函數 (只呼叫一次 predict_proba)"""
+    def scorer(estimator, X, y):
+        y_proba = estimator.predict_proba(X)[:, 1]
+        return evaluate_scores(y, y_proba, k_list=())[metric]
+    return scorer
+
+def evaluate_model(model, X_test, y_test, threshold=0.5, k_list=(100, 500, 1000)):
+    """
+    輸出 classification report 與所有評估指標 (只呼叫一次 predict_proba、只排序一次)
+    回傳 (report, scores, y_pred, y_proba)，scores 為 evaluate_scores() 的結果
+    """
     y_proba = model.predict_proba(X_test)[:, 1]
+    y_pred = (y_proba >= threshold).astype(int)
     report = classification_report(y_test, y_pred, digits=4)
-    auc = roc_auc_score(y_test, y_proba)
-    return report, auc, y_pred, y_proba
+    scores = evaluate_scores(y_test, y_proba, k_list=k_list)
+    return report, scores, y_pred, y_proba
 
 def find_best_threshold(y_test, y_proba):
-    """搜尋最佳 threshold (以 F1 為準)"""
-    thresholds = np.linspace(0.1, 0.9, 17)
-    best_threshold, best_f1 = 0.5, 0
-    for t in thresholds:
-        y_pred_thresh = (y_proba >= t).astype(int)
-        f1 = f1_score(y_test, y_pred_thresh)
-        if f1 > best_f1:
-            best_f1, best_threshold = f1, t
-    return best_threshold, best_f1
\ No newline at end of file
+    """搜尋最佳 threshold (以 F1 為準，涵蓋所有相異分數)；已有 evaluate_model() 結果時直接使用 scores 即可"""
+    scores = evaluate_scores(y_test, y_proba, k_list=())
+    return scores["best_threshold"], scores["best_f1"]
@@ -1,30 +1,200 @@
-import seaborn as sns
-import matplotlib.pyplot as plt
-import os 
+import os, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import numpy as np
 import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 
-def monitor_account_features(acct_features: pd.DataFrame, output_dir: str):
-    os.makedirs(output_dir, exist_ok=True)
+from data.split import stratified_sample_index
+
+'''
+帳戶特徵監控圖（聚合 + 抽樣）
+
+1. 先聚合再繪圖
+- 帳戶特徵表約 80 萬筆，直接畫 pairplot / jointplot 會畫出數百萬個散佈點，速度慢且吃記憶體。
+- 改為先用 NumPy 算好 1D / 2D 直方圖（每組不重複的欄位組合只掃過資料一次），繪圖時只處理 bins × bins 的格子。
+- 金額特徵為重尾分布，以 log1p 尺度分箱；格子顏色以對數尺度顯示筆數。
+
+2. 分層抽樣疊加散佈點（選用）
+- sample_size 不為 None 時，抽樣部分帳戶疊加在直方圖上。
+- 抽樣保留所有警示帳戶 (label=1)，並以紅色標示。
+
+3. 背景繪圖
+- background=True 時，聚合結果交給背景 process (spawn) 繪圖，主流程不必等待，回傳 BackgroundPlots。
+- 背景 process 在 BackgroundPlots.wait() 時才結束並回收，其 CPU time 只會算進呼叫 wait() 的階段，
+  不會被算進背景繪圖期間剛好在執行的其他階段 (RUSAGE_CHILDREN 在子 process 被回收時才累加)。
+'''
+
+AMT_COLS = ["txn_amt_mean", "txn_amt_max", "txn_amt_std"]
+TIME_COLS = ("txn_per_day", "night_ratio")
+NETWORK_COLS = ("out_degree", "in_degree")
+LOG_SCALE_COLS = set(AMT_COLS)
+
+def _axis_values(acct_features: pd.DataFrame, col: str) -> np.ndarray:
+    """取出欄位數值（重尾欄位轉為 log1p 尺度）"""
+    values = acct_features[col].to_numpy(dtype=float)
+    if col in LOG_SCALE_COLS:
+        values = np.log1p(np.clip(values, 0, None))
+    return values
+
+def _axis_label(col: str) -> str:
+    return f"log1p({col})" if col in LOG_SCALE_COLS else col
+
+def _value_range(values: np.ndarray):
+    """回傳有限值的範圍，避免 min == max 時 histogram 出錯"""
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return 0.0, 1.0
+    low, high = finite.min(), finite.max()
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return low, high
+
+def aggregate_account_features(acct_features: pd.DataFrame, bins: int = 100, sample_size=None,
+                               label_col: str = "label", random_state: int = 42) -> dict:
+    """
+    將監控圖所需的資料聚合成直方圖：
+    - hist1d[col] = (counts, edges)
+    - hist2d[(x, y)] = (counts, xedges, yedges)，每組欄位只存一個方向
+    - points = 分層抽樣的散佈點（保留所有警示帳戶），sample_size 為 None 時不抽樣
+    """
+    cols = list(dict.fromkeys(AMT_COLS + list(TIME_COLS) + list(NETWORK_COLS)))
+    values = {col: _axis_values(acct_features, col) for col in cols}
+    ranges = {col: _value_range(values[col]) for col in cols}
+    finite = {col: np.isfinite(values[col]) for col in cols}
+
+    hist1d = {}
+    for col in cols:
+        counts, edges = np.histogram(values[col][finite[col]], bins=bins, range=ranges[col])
+        hist1d[col] = (counts, edges)
+
+    # 金額特徵只算不重複的欄位組合，(y, x) 由 (x, y) 轉置取得
+    pairs = list(combinations(AMT_COLS, 2)) + [TIME_COLS, NETWORK_COLS]
+    hist2d = {}
+    for x, y in pairs:
+        mask = finite[x] & finite[y]
+        counts, xedges, yedges = np.histogram2d(
+            values[x][mask], values[y][mask], bins=bins, range=[ranges[x], ranges[y]]
+        )
+        hist2d[(x, y)] = (counts, xedges, yedges)
 
-    # 1️⃣ 金額特徵 pairplot
-    amt_cols = ["txn_amt_mean", "txn_amt_max", "txn_amt_std"]
-    sns.pairplot(acct_features[amt_cols])
-    plt.suptitle("Pairplot of Amount Features", fontsize=14)
-    plt.savefig(os.path.join(output_dir, "pairplot_amount_features.png"))
-    plt.close()
+    points = None
+    if sample_size is not None:
+        if label_col in acct_features.columns:
+            labels = acct_features[label_col].to_numpy()
+        else:
+            labels = np.zeros(len(acct_features), dtype=int)
+        idx = stratified_sample_index(labels, sample_size, random_state=random_state)
+        points = {col: values[col][idx] for col in cols}
+        points["is_alert"] = labels[idx] == 1
+
+    return {"hist1d": hist1d, "hist2d": hist2d, "points": points}
+
+def _draw_hist2d(ax, aggregates: dict, x: str, y: str):
+    """在 ax 上畫出 2D 直方圖，並疊加抽樣散佈點（只存 (y, x) 時轉置使用）"""
+    if (x, y) in aggregates["hist2d"]:
+        counts, xedges, yedges = aggregates["hist2d"][(x, y)]
+    else:
+        counts, yedges, xedges = aggregates["hist2d"][(y, x)]
+        counts = counts.T
+    masked = np.ma.masked_equal(counts.T, 0)
+    if masked.count() > 0:
+        ax.pcolormesh(xedges, yedges, masked, cmap="Blues", norm=LogNorm(vmin=1, vmax=counts.max()))
+
+    points = aggregates["points"]
+    if points is not None:
+        normal = ~points["is_alert"]
+        ax.scatter(points[x][normal], points[y][normal], s=2, c="gray", alpha=0.3, label="sample")
+        ax.scatter(points[x][~normal], points[y][~normal], s=4, c="red", alpha=0.7, label="alert")
+
+def _draw_hist1d(ax, aggregates: dict, col: str):
+    counts, edges = aggregates["hist1d"][col]
+    ax.stairs(counts, edges, fill=True, color="steelblue")
+
+def render_account_feature_plots(aggregates: dict, output_dir: str) -> float:
+    """依聚合結果輸出三張監控圖，回傳繪圖使用的 CPU time (秒)"""
+    cpu_start = time.process_time()
+    plt.switch_backend("Agg")
+
+    # 1️⃣ 金額特徵 pairplot（對角線為 1D 直方圖，其餘為 2D 直方圖）
+    n = len(AMT_COLS)
+    fig, axes = plt.subplots(n, n, figsize=(3 * n, 3 * n))
+    for i, y in enumerate(AMT_COLS):
+        for j, x in enumerate(AMT_COLS):
+            ax = axes[i, j]
+            if i == j:
+                _draw_hist1d(ax, aggregates, x)
+            else:
+                _draw_hist2d(ax, aggregates, x, y)
+            if i == n - 1:
+                ax.set_xlabel(_axis_label(x))
+            if j == 0:
+                ax.set_ylabel(_axis_label(y))
+    fig.suptitle("Pairplot of Amount Features", fontsize=14)
+    fig.savefig(os.path.join(output_dir, "pairplot_amount_features.png"))
+    plt.close(fig)
 
     # 2️⃣ 時間特徵散佈圖
-    plt.figure(figsize=(8, 6))
-    sns.scatterplot(data=acct_features, x="txn_per_day", y="night_ratio")
-    plt.title("Scatterplot of Time Features")
-    plt.xlabel("Transactions per Day")
-    plt.ylabel("Night Transaction Ratio")
-    plt.grid(True)
-    plt.savefig(os.path.join(output_dir, "scatter_time_features.png"))
-    plt.close()
-
-    # 3️⃣ 網路特徵 jointplot
-    sns.jointplot(data=acct_features, x="out_degree", y="in_degree", kind="scatter", height=6)
-    plt.suptitle("Jointplot of Network Features", fontsize=14)
-    plt.savefig(os.path.join(output_dir, "jointplot_network_features.png"))
-    plt.close()
\ No newline at end of file
+    x, y = TIME_COLS
+    fig, ax = plt.subplots(figsize=(8, 6))
+    _draw_hist2d(ax, aggregates, x, y)
+    ax.set_title("Scatterplot of Time Features")
+    ax.set_xlabel("Transactions per Day")
+    ax.set_ylabel("Night Transaction Ratio")
+    ax.grid(True)
+    fig.savefig(os.path.join(output_dir, "scatter_time_features.png"))
+    plt.close(fig)
+
+    # 3️⃣ 網路特徵 jointplot（中央 2D 直方圖 + 上方/右方邊際分布）
+    x, y = NETWORK_COLS
+    fig = plt.figure(figsize=(6, 6))
+    grid = fig.add_gridspec(2, 2, width_ratios=(5, 1), height_ratios=(1, 5), hspace=0.05, wspace=0.05)
+    ax_joint = fig.add_subplot(grid[1, 0])
+    ax_top = fig.add_subplot(grid[0, 0], sharex=ax_joint)
+    ax_right = fig.add_subplot(grid[1, 1], sharey=ax_joint)
+    _draw_hist2d(ax_joint, aggregates, x, y)
+    _draw_hist1d(ax_top, aggregates, x)
+    counts, edges = aggregates["hist1d"][y]
+    ax_right.stairs(counts, edges, fill=True, color="steelblue", orientation="horizontal")
+    ax_top.tick_params(labelbottom=False)
+    ax_right.tick_params(labelleft=False)
+    ax_joint.set_xlabel(x)
+    ax_joint.set_ylabel(y)
+    fig.suptitle("Jointplot of Network Features", fontsize=14)
+    fig.savefig(os.path.join(output_dir, "jointplot_network_features.png"))
+    plt.close(fig)
+    return time.process_time() - cpu_start
+
+class BackgroundPlots:
+    """背景繪圖工作；wait() 等待繪圖完成並關閉背景 process，回傳背景 process 回報的繪圖 CPU time (秒)"""
+    def __init__(self, executor: ProcessPoolExecutor, future):
+        self.executor = executor
+        self.future = future
+
+    def wait(self) -> float:
+        try:
+            return self.future.result()
+        finally:
+            self.executor.shutdown(wait=True)
+
+def monitor_account_features(acct_features: pd.DataFrame, output_dir: str, bins: int = 100,
+                             sample_size=None, background: bool = False):
+    """
+    輸出帳戶特徵監控圖：
+    - 先以 NumPy 聚合成直方圖，再依聚合結果繪圖
+    - background=True 時於背景 process (spawn) 繪圖並回傳 BackgroundPlots，否則直接繪圖並回傳 None
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    aggregates = aggregate_account_features(acct_features, bins=bins, sample_size=sample_size)
+
+    if not background:
+        render_account_feature_plots(aggregates, output_dir)
+        return None
+
+    # 使用 spawn 而非 fork，避免複製主程序中 XGBoost 的執行緒狀態造成 deadlock
+    executor = ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn"))
+    # 不在此 shutdown：背景 process 留到 wait() 才結束，避免在其他階段被回收而把 CPU time 算進該階段
+    future = executor.submit(render_account_feature_plots, aggregates, output_dir)
+    return BackgroundPlots(executor, future)
@@ -1,6 +1,11 @@
 from sklearn.model_selection import StratifiedKFold, cross_val_score
 from xgboost import XGBClassifier
 
+from evaluation.metrics import make_curve_scorer
+
+N_ESTIMATORS = 2000  # 每個 fold 的 boosting rounds
+N_SPLITS = 3         # cross validation fold 數
+
 def fitness_function(params, X_train_processed, y_train, scale_pos_weight):
     """以 AUC 作為適應度函數"""
     max_depth = int(params[0])
@@ -18,7 +23,7 @@ def fitness_function(params, X_train_processed, y_train, scale_pos_weight):
         colsample_bytree=colsample_bytree,
         reg_lambda=reg_lambda,
         reg_alpha=reg_alpha,
-        n_estimators=2000,
+        n_estimators=N_ESTIMATORS,
         early_stopping_rounds=None,
         eval_metric="auc",
         objective="binary:logistic",
@@ -28,7 +33,7 @@ def fitness_function(params, X_train_processed, y_train, scale_pos_weight):
         verbosity=0
     )
 
-    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=42)
-    scores = cross_val_score(model, X_train_processed, y_train, cv=cv, scoring="roc_auc")
+    cv = StratifiedKFold(n_splits=N_SPLITS, shuffle=True, random_state=42)
+    scores = cross_val_score(model, X_train_processed, y_train, cv=cv, scoring=make_curve_scorer("auc"))
     return scores.mean()
     #return auc_score
\ No newline at end of file
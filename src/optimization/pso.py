@@ -1,4 +1,5 @@
 import numpy as np
+from contextlib import nullcontext
 
 '''
 粒子群演算法 (Particle Swarm Optimization, PSO)
@@ -44,8 +45,9 @@ x_{i}(t+1) = x_{i}(t) + v_{i}(t+1)
 
 class PSO:
     def __init__(self, fitness_func, dim, bounds, num_particles=10, max_iter=10,
-                 w=0.7, c1=1.5, c2=1.5):
+                 w=0.7, c1=1.5, c2=1.5, tracker=None):
         self.fitness_func = fitness_func
+        self.tracker = tracker  # 選用：RunTracker，記錄每次迭代的時間與記憶體
         self.dim = dim
         self.bounds = bounds
         self.num_particles = num_particles
@@ -55,25 +57,34 @@ class PSO:
         self.X = np.random.uniform(bounds[:,0], bounds[:,1], (num_particles, dim))
         self.V = np.random.uniform(-1, 1, (num_particles, dim))
         self.pbest = self.X.copy()
-        self.pbest_scores = np.array([fitness_func(x) for x in self.X])
+        with self._stage("pso_init"):
+            self.pbest_scores = np.array([fitness_func(x) for x in self.X])
         self.gbest = self.pbest[np.argmax(self.pbest_scores)]
         self.gbest_score = max(self.pbest_scores)
 
     def optimize(self):
         for t in range(self.max_iter):
-            for i in range(self.num_particles):
-                r1, r2 = np.random.rand(self.dim), np.random.rand(self.dim)
-                self.V[i] = (self.w * self.V[i] +
-                             self.c1 * r1 * (self.pbest[i] - self.X[i]) +
-                             self.c2 * r2 * (self.gbest - self.X[i]))
-                self.X[i] = np.clip(self.X[i] + self.V[i], self.bounds[:,0], self.bounds[:,1])
+            with self._stage("pso_iteration", iteration=t+1):
+                self._step()
+            print(f"Iter {t+1}/{self.max_iter} | Best AUC={self.gbest_score:.4f}")
 
-                score = self.fitness_func(self.X[i])
-                if score > self.pbest_scores[i]:
-                    self.pbest[i], self.pbest_scores[i] = self.X[i], score
-                    if score > self.gbest_score:
-                        self.gbest, self.gbest_score = self.X[i], score
+        return self.gbest, self.gbest_score
 
-            print(f"Iter {t+1}/{self.max_iter} | Best AUC={self.gbest_score:.4f}")
+    def _stage(self, name, **extra):
+        if self.tracker is None:
+            return nullcontext()
+        return self.tracker.stage(name, rows=self.num_particles, **extra)
+
+    def _step(self):
+        for i in range(self.num_particles):
+            r1, r2 = np.random.rand(self.dim), np.random.rand(self.dim)
+            self.V[i] = (self.w * self.V[i] +
+                         self.c1 * r1 * (self.pbest[i] - self.X[i]) +
+                         self.c2 * r2 * (self.gbest - self.X[i]))
+            self.X[i] = np.clip(self.X[i] + self.V[i], self.bounds[:,0], self.bounds[:,1])
 
-        return self.gbest, self.gbest_score
\ No newline at end of file
+            score = self.fitness_func(self.X[i])
+            if score > self.pbest_scores[i]:
+                self.pbest[i], self.pbest_scores[i] = self.X[i], score
+                if score > self.gbest_score:
+                    self.gbest, self.gbest_score = self.X[i], score
\ No newline at end of file
@@ -12,159 +12,230 @@ from preprocessing.pipeline import build_preprocessing_pipeline
 from utils.file_utils import check_input_files, get_output_dir
 from utils.class_weights import compute_scale_pos_weight
 from utils.io_utils import save_model, load_model
+from utils.instrumentation import RunTracker
 from optimization.pso import PSO
-from optimization.fitness import fitness_function
+from optimization.fitness import fitness_function, N_ESTIMATORS, N_SPLITS
 from models.train import train_xgb
-from evaluation.metrics import evaluate_model, find_best_threshold
+from evaluation.metrics import evaluate_model
 from evaluation.diagnose_feature import diagnose_features
 from predict.predict import run_prediction
 
-# =========================
-# 1. 載入 config
-# =========================
-parser = argparse.ArgumentParser()
-parser.add_argument("--config", default="configs/config.yaml", help="Path to config file")
-args = parser.parse_args()
-project_root = os.path.dirname(os.path.dirname(__file__))
-config_path = os.path.join(project_root, args.config)
-
-# 讀取 config.yaml
-with open(config_path, "r", encoding="utf-8") as f:
-    config = yaml.safe_load(f)
-
-# Input檔案路徑
-acct_transaction_csv = config["input"]["acct_transaction_csv"]
-acct_alert_csv = config["input"]["acct_alert_csv"]
-acct_predict_csv = config["input"]["acct_predict_csv"]
-
-# 檢查Input檔案
-check_input_files([acct_transaction_csv, acct_alert_csv, acct_predict_csv])
-
-# 設定Output檔案路徑
-base_output_dir = get_output_dir("outputs")
-
-# =========================
-# 2. 載入資料
-# =========================
-print("[INFO] 載入資料...")
-txn_df = load_transaction_data(acct_transaction_csv)
-alert_df = load_alert_data(acct_alert_csv)
-
-# =========================
-# 3. 特徵工程 + 標籤
-# =========================
-print("[INFO] 建立帳戶層級特徵...")
-acct_features = build_account_features(txn_df)
-print("[INFO] 建立標籤...")
-acct_features = create_labels(acct_features, alert_df)
-
-X = acct_features.drop(columns=["acct", "label"])
-y = acct_features["label"]
-
-feature_plots_dir = os.path.join(base_output_dir, "feature_plots")
-monitor_account_features(acct_features, output_dir=feature_plots_dir)
-
-# =========================
-# 4. 切分資料
-# =========================
-print("[INFO] 切分資料...")
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, stratify=y, random_state=42
-)
-
-# =========================
-# 5. 前處理 pipeline
-# =========================
-print("[INFO] 建立前處理 pipeline...")
-pipeline = build_preprocessing_pipeline(X.columns.tolist())
-X_train_processed = pipeline.fit_transform(X_train)
-X_test_processed = pipeline.transform(X_test)
-
-# =========================
-# 6. 樣本不平衡處理
-#   設為 (負樣本數 / 正樣本數)
-# =========================
-scale_pos_weight = compute_scale_pos_weight(y_train)
-print(f"[INFO] scale_pos_weight = {scale_pos_weight:.2f}")
-
-# =========================
-# 7. 粒子群最佳化 (PSO)
-# =========================
-# 定義搜尋範圍
-bounds = np.array([
-    [3, 10],       # max_depth
-    [0.01, 0.1],   # learning_rate
-    [0.6, 1.0],    # subsample
-    [0.6, 1.0],    # colsample_bytree
-    [0.5, 3.0],    # reg_lambda
-    [0.0, 1.0]     # reg_alpha
-])
-
-print("[INFO] 開始粒子群最佳化 (PSO)...")
-pso_config = config["pso"]
-bounds = np.array(pso_config["bounds"])
-fitness = lambda params: fitness_function(params, X_train_processed, y_train, scale_pos_weight)
-pso = PSO(
-    fitness_func=fitness,
-    dim=pso_config["dim"],
-    bounds=bounds,
-    num_particles=pso_config["num_particles"],
-    max_iter=pso_config["max_iter"]
-)
-best_params, best_score = pso.optimize()
-print(f"[INFO] PSO 最佳參數: {best_params}")
-print(f"[INFO] PSO 最佳 AUC: {best_score:.4f}")
-
-# =========================
-# 8. 訓練最終模型
-# =========================
-params = {
-    "scale_pos_weight": scale_pos_weight,
-    "max_depth": int(best_params[0]),
-    "learning_rate": best_params[1],
-    "subsample": best_params[2],
-    "colsample_bytree": best_params[3],
-    "reg_lambda": best_params[4],
-    "reg_alpha": best_params[5],
-    "n_estimators": config["model"]["n_estimators"],
-    "early_stopping_rounds": config["model"]["early_stopping_rounds"],
-    "eval_metric": config["model"]["eval_metric"],
-    "objective": config["model"]["objective"],
-    "device": config["model"]["device"],
-    "random_state": config["model"]["random_state"],
-    "n_jobs": config["model"]["n_jobs"],
-}
-print(f"[INFO] 最終模型參數: {params}")
-print("[INFO] 訓練最終模型...")
-model_plots_dir = os.path.join(base_output_dir, "model_plots")
-model = train_xgb(X_train_processed, y_train, X_test_processed, y_test, params, output_dir=model_plots_dir)
-
-# =========================
-# 9. 評估模型
-# =========================
-print("[INFO] 進行特徵診斷...")
-summary_csv = os.path.join(base_output_dir, "feature_diagnosis_summary.csv")
-diagnose_features(X_train, X_test, y_train, y_test, model, output_dir=feature_plots_dir, summary_csv=summary_csv)
-
-report, auc, y_pred, y_proba = evaluate_model(model, X_test_processed, y_test)
-print(report)
-print(f"AUC: {auc:.4f}")
-
-best_threshold, best_f1 = find_best_threshold(y_test, y_proba)
-print(f"[INFO] 最佳 Threshold: {best_threshold:.2f}, F1={best_f1:.4f}")
-
-# =========================
-# 10. 儲存模型
-# =========================
-saved_model_path = os.path.join(base_output_dir, "xgb_acctlevel_model.joblib")
-save_model({"pipeline": pipeline, "model": model, "best_threshold": best_threshold}, saved_model_path)
-print(f"[INFO] 模型已儲存到 {saved_model_path}")
-
-# =========================
-# 11. 載入模型並預測
-# =========================
-saved = load_model(saved_model_path)
-pipeline, model, best_threshold = saved["pipeline"], saved["model"], saved["best_threshold"]
-
-acct_predict_result_csv = os.path.join(base_output_dir, "acct_predict_result.csv")
-result_df = run_prediction(model, pipeline, acct_features, acct_predict_csv, acct_predict_result_csv)
+def main():
+    # =========================
+    # 1. 載入 config
+    # =========================
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="configs/config.yaml", help="Path to config file")
+    args = parser.parse_args()
+    project_root = os.path.dirname(os.path.dirname(__file__))
+    config_path = os.path.join(project_root, args.config)
+
+    # 讀取 config.yaml
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    # Input檔案路徑
+    acct_transaction_csv = config["input"]["acct_transaction_csv"]
+    acct_alert_csv = config["input"]["acct_alert_csv"]
+    acct_predict_csv = config["input"]["acct_predict_csv"]
+
+    # 檢查Input檔案
+    check_input_files([acct_transaction_csv, acct_alert_csv, acct_predict_csv])
+
+    # 設定Output檔案路徑
+    base_output_dir = get_output_dir("outputs")
+
+    # 執行紀錄 (各階段時間 / 記憶體，JSON lines)
+    instr_config = config.get("instrumentation", {})
+    tracker = RunTracker(
+        base_output_dir,
+        run_log=instr_config.get("run_log", "run_log.jsonl"),
+        profile_stages=instr_config.get("profile_stages", []),
+        profile_interval=instr_config.get("profile_interval", 0.001)
+    )
+
+    # =========================
+    # 2. 載入資料
+    # =========================
+    print("[INFO] 載入資料...")
+    with tracker.stage("load_data") as record:
+        txn_df = load_transaction_data(acct_transaction_csv)
+        alert_df = load_alert_data(acct_alert_csv)
+        record["rows"] = len(txn_df)
+
+    # =========================
+    # 3. 特徵工程 + 標籤
+    # =========================
+    print("[INFO] 建立帳戶層級特徵...")
+    with tracker.stage("build_account_features", rows=len(txn_df)):
+        acct_features = build_account_features(txn_df)
+    print("[INFO] 建立標籤...")
+    with tracker.stage("create_labels", rows=len(acct_features)):
+        acct_features = create_labels(acct_features, alert_df)
+
+    X = acct_features.drop(columns=["acct", "label"])
+    y = acct_features["label"]
+
+    feature_plots_dir = os.path.join(base_output_dir, "feature_plots")
+    monitor_config = config.get("monitor", {})
+    with tracker.stage("monitor_account_features", rows=len(acct_features)):
+        monitor_job = monitor_account_features(
+            acct_features,
+            output_dir=feature_plots_dir,
+            bins=monitor_config.get("bins", 100),
+            sample_size=monitor_config.get("sample_size"),
+            background=monitor_config.get("background", False)
+        )
+
+    # =========================
+    # 4. 切分資料
+    # =========================
+    print("[INFO] 切分資料...")
+    with tracker.stage("split", rows=len(X)):
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, stratify=y, random_state=42
+        )
+
+    # =========================
+    # 5. 前處理 pipeline
+    # =========================
+    print("[INFO] 建立前處理 pipeline...")
+    with tracker.stage("preprocessing", rows=len(X)):
+        pipeline = build_preprocessing_pipeline(X.columns.tolist())
+        X_train_processed = pipeline.fit_transform(X_train)
+        X_test_processed = pipeline.transform(X_test)
+
+    # =========================
+    # 6. 樣本不平衡處理
+    #   設為 (負樣本數 / 正樣本數)
+    # =========================
+    scale_pos_weight = compute_scale_pos_weight(y_train)
+    print(f"[INFO] scale_pos_weight = {scale_pos_weight:.2f}")
+
+    # =========================
+    # 7. 粒子群最佳化 (PSO)
+    # =========================
+    # 定義搜尋範圍
+    bounds = np.array([
+        [3, 10],       # max_depth
+        [0.01, 0.1],   # learning_rate
+        [0.6, 1.0],    # subsample
+        [0.6, 1.0],    # colsample_bytree
+        [0.5, 3.0],    # reg_lambda
+        [0.0, 1.0]     # reg_alpha
+    ])
+
+    print("[INFO] 開始粒子群最佳化 (PSO)...")
+    pso_config = config["pso"]
+    bounds = np.array(pso_config["bounds"])
+
+    def fitness(params):
+        with tracker.stage("fitness_function", rows=len(y_train),
+                           boosting_rounds=N_ESTIMATORS * N_SPLITS) as record:
+            score = fitness_function(params, X_train_processed, y_train, scale_pos_weight)
+            record["score"] = float(score)
+        return score
+
+    with tracker.stage("pso", rows=len(y_train)):
+        pso = PSO(
+            fitness_func=fitness,
+            dim=pso_config["dim"],
+            bounds=bounds,
+            num_particles=pso_config["num_particles"],
+            max_iter=pso_config["max_iter"],
+            tracker=tracker
+        )
+        best_params, best_score = pso.optimize()
+    print(f"[INFO] PSO 最佳參數: {best_params}")
+    print(f"[INFO] PSO 最佳 AUC: {best_score:.4f}")
+
+    # =========================
+    # 8. 訓練最終模型
+    # =========================
+    params = {
+        "scale_pos_weight": scale_pos_weight,
+        "max_depth": int(best_params[0]),
+        "learning_rate": best_params[1],
+        "subsample": best_params[2],
+        "colsample_bytree": best_params[3],
+        "reg_lambda": best_params[4],
+        "reg_alpha": best_params[5],
+        "n_estimators": config["model"]["n_estimators"],
+        "early_stopping_rounds": config["model"]["early_stopping_rounds"],
+        "eval_metric": config["model"]["eval_metric"],
+        "objective": config["model"]["objective"],
+        "device": config["model"]["device"],
+        "random_state": config["model"]["random_state"],
+        "n_jobs": config["model"]["n_jobs"],
+    }
+    print(f"[INFO] 最終模型參數: {params}")
+    print("[INFO] 訓練最終模型...")
+    model_plots_dir = os.path.join(base_output_dir, "model_plots")
+    with tracker.stage("train_xgb", rows=len(y_train)) as record:
+        model = train_xgb(X_train_processed, y_train, X_test_processed, y_test, params, output_dir=model_plots_dir)
+        record["boosting_rounds"] = model.get_booster().num_boosted_rounds()
+
+    # =========================
+    # 9. 評估模型
+    # =========================
+    print("[INFO] 進行特徵診斷...")
+    summary_csv = os.path.join(base_output_dir, "feature_diagnosis_summary.csv")
+    diag_config = config.get("diagnostics", {})
+    with tracker.stage("diagnose_features", rows=len(X_train)):
+        diagnose_features(
+            X_train, X_test, y_train, y_test, model,
+            output_dir=feature_plots_dir,
+            summary_csv=summary_csv,
+            sample_size=diag_config.get("sample_size"),
+            shap_sample_size=diag_config.get("shap_sample_size"),
+            plot_workers=diag_config.get("plot_workers", 1),
+            skip_plots=diag_config.get("skip_plots", False)
+        )
+
+    with tracker.stage("evaluate", rows=len(y_test)):
+        report, scores, y_pred, y_proba = evaluate_model(
+            model, X_test_processed, y_test,
+            k_list=config.get("evaluation", {}).get("k_list", [100, 500, 1000])
+        )
+    print(report)
+    print(f"AUC: {scores['auc']:.4f}")
+    print(f"PR-AUC: {scores['pr_auc']:.4f}")
+    for name, value in scores.items():
+        if "@" in name:
+            print(f"{name}: {value:.4f}")
+
+    best_threshold, best_f1 = scores["best_threshold"], scores["best_f1"]
+    print(f"[INFO] 最佳 Threshold: {best_threshold:.4f}, F1={best_f1:.4f}")
+
+    # =========================
+    # 10. 儲存模型
+    # =========================
+    saved_model_path = os.path.join(base_output_dir, "xgb_acctlevel_model.joblib")
+    with tracker.stage("save_model"):
+        save_model({"pipeline": pipeline, "model": model, "best_threshold": best_threshold}, saved_model_path)
+    print(f"[INFO] 模型已儲存到 {saved_model_path}")
+
+    # =========================
+    # 11. 載入模型並預測
+    # =========================
+    saved = load_model(saved_model_path)
+    pipeline, model, best_threshold = saved["pipeline"], saved["model"], saved["best_threshold"]
+
+    acct_predict_result_csv = os.path.join(base_output_dir, "acct_predict_result.csv")
+    with tracker.stage("run_prediction", rows=len(acct_features)):
+        result_df = run_prediction(model, pipeline, acct_features, acct_predict_csv, acct_predict_result_csv)
+
+    # 等待背景監控圖完成
+    if monitor_job is not None:
+        with tracker.stage("monitor_plots_wait") as record:
+            # 背景 process 在此階段結束並回收，child_cpu_time_s 含其完整 CPU time (含啟動與 import)
+            record["plot_cpu_time_s"] = round(monitor_job.wait(), 4)
+        print(f"[INFO] 帳戶特徵監控圖已輸出到 {feature_plots_dir}")
+
+    # =========================
+    # 12. 執行時間 / 記憶體總表
+    # =========================
+    tracker.print_summary()
+
+if __name__ == "__main__":
+    main()
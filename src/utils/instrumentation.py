@@ -0,0 +1,181 @@
+import json, os, resource, sys, time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+'''
+Pipeline 執行紀錄 (instrumentation)
+
+📌 用途
+以 RunTracker.stage() 包住每個階段，記錄：
+- wall time / CPU time（含已結束子 process 的 CPU time）
+- peak RSS（Linux 透過 /proc/self/clear_refs 在每個階段開始時重設，其他平台為整個 process 的最大值）
+- 處理筆數 (rows)、boosting rounds 等額外欄位
+
+每個階段結束時寫入一行 JSON 到 run log (JSON lines)，執行結束後可用 print_summary() 印出總表。
+階段可以巢狀（例如 pso → pso_iteration → fitness_function），子階段的 peak RSS 會併入父階段。
+子 process 的 CPU time 在子 process 被回收時才累加，背景 process 需在負責等待它的階段內回收
+（見 features/monitor_features.py 的 BackgroundPlots），否則會被算進回收當下正在執行的階段。
+
+🔍 Sampling profiler（選用）
+profile_stages 中列出的階段會以 pyinstrument 取樣，輸出 HTML 報告到 profiles/ 目錄；未安裝 pyinstrument 時略過。
+'''
+
+def reset_peak_rss():
+    """重設 peak RSS (Linux: 寫入 /proc/self/clear_refs)，不支援時回傳 False"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    """讀取 peak RSS (MB)；無 /proc 時改用 getrusage (整個 process 的最大值)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+
+def _children_cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class RunTracker:
+    def __init__(self, output_dir: str, run_log: str = "run_log.jsonl", profile_stages=(),
+                 profile_interval: float = 0.001, verbose: bool = True):
+        self.output_dir = output_dir
+        self.run_log_path = os.path.join(output_dir, run_log) if run_log else None
+        self.profile_stages = set(profile_stages or ())
+        self.profile_interval = profile_interval
+        self.verbose = verbose
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.records = []
+        self._stack = []
+        self._seq = 0
+        self._profile_counts = {}
+
+        if self.run_log_path:
+            os.makedirs(output_dir, exist_ok=True)
+        if self.profile_stages and Profiler is None:
+            print("[WARN] 未安裝 pyinstrument，略過 profile_stages 設定")
+
+    @contextmanager
+    def stage(self, name: str, rows=None, **extra):
+        """
+        記錄單一階段；yield 出的 record 可在階段內補上欄位，例如：
+            with tracker.stage("train_xgb", rows=len(X)) as record:
+                model = ...
+                record["boosting_rounds"] = model.num_boosted_rounds()
+        """
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None:
+            # 重設前先把目前的 peak 併入父階段
+            parent["_peak_rss_mb"] = max(parent["_peak_rss_mb"], peak_rss_mb())
+        reset_peak_rss()
+
+        self._seq += 1
+        record = {
+            "run_id": self.run_id,
+            "seq": self._seq,
+            "stage": name,
+            "parent": parent["stage"] if parent is not None else None,
+            "depth": len(self._stack),
+            "start_time": datetime.now().isoformat(timespec="seconds"),
+            "rows": rows,
+            **extra,
+            "_peak_rss_mb": 0.0,
+        }
+        self._stack.append(record)
+
+        profiler = None
+        if name in self.profile_stages and Profiler is not None:
+            profiler = Profiler(interval=self.profile_interval)
+            profiler.start()
+
+        wall_start, cpu_start, child_cpu_start = time.perf_counter(), time.process_time(), _children_cpu_time()
+        try:
+            yield record
+            record["status"] = "ok"
+        except BaseException as e:
+            record["status"] = "error"
+            record["error"] = repr(e)
+            raise
+        finally:
+            record["wall_time_s"] = round(time.perf_counter() - wall_start, 4)
+            record["cpu_time_s"] = round(time.process_time() - cpu_start, 4)
+            record["child_cpu_time_s"] = round(_children_cpu_time() - child_cpu_start, 4)
+            record["peak_rss_mb"] = round(max(record.pop("_peak_rss_mb"), peak_rss_mb()), 1)
+            self._stack.pop()
+            if parent is not None:
+                parent["_peak_rss_mb"] = max(parent["_peak_rss_mb"], record["peak_rss_mb"])
+            if profiler is not None:
+                profiler.stop()
+                self._write_profile(name, profiler)
+            self._emit(record)
+
+    def _write_profile(self, name: str, profiler):
+        count = self._profile_counts.get(name, 0) + 1
+        self._profile_counts[name] = count
+        profile_dir = os.path.join(self.output_dir, "profiles")
+        os.makedirs(profile_dir, exist_ok=True)
+        profile_path = os.path.join(profile_dir, f"{name}_{count}.html")
+        with open(profile_path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+        print(f"[INFO] {name} profile 已輸出到 {profile_path}")
+
+    def _emit(self, record: dict):
+        self.records.append(record)
+        if self.run_log_path:
+            with open(self.run_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        if self.verbose and record["depth"] == 0:
+            print(f"[INFO] 階段 {record['stage']} 完成：wall={record['wall_time_s']:.2f}s, "
+                  f"cpu={record['cpu_time_s']:.2f}s, peak_rss={record['peak_rss_mb']:.1f}MB")
+
+    def summarize(self) -> list:
+        """依階段名稱彙總 (呼叫次數、總 wall/CPU time、最大 peak RSS、總筆數、boosting rounds)"""
+        summary = {}
+        for r in self.records:
+            s = summary.setdefault(r["stage"], {
+                "stage": r["stage"], "depth": r["depth"], "calls": 0, "wall_time_s": 0.0,
+                "cpu_time_s": 0.0, "peak_rss_mb": 0.0, "rows": 0, "boosting_rounds": 0,
+            })
+            s["depth"] = min(s["depth"], r["depth"])
+            s["calls"] += 1
+            s["wall_time_s"] += r["wall_time_s"]
+            s["cpu_time_s"] += r["cpu_time_s"] + r["child_cpu_time_s"]
+            s["peak_rss_mb"] = max(s["peak_rss_mb"], r["peak_rss_mb"])
+            s["rows"] += r.get("rows") or 0
+            s["boosting_rounds"] += r.get("boosting_rounds") or 0
+        # 依第一次開始的順序排列
+        order = {}
+        for r in self.records:
+            order[r["stage"]] = min(order.get(r["stage"], r["seq"]), r["seq"])
+        return sorted(summary.values(), key=lambda s: order[s["stage"]])
+
+    def print_summary(self):
+        """印出各階段時間與記憶體總表，% 為佔頂層階段總 wall time 的比例"""
+        summary = self.summarize()
+        total_wall = sum(r["wall_time_s"] for r in self.records if r["depth"] == 0) or float("nan")
+        header = (f"{'stage':<28}{'calls':>7}{'wall(s)':>10}{'%':>7}{'cpu(s)':>10}"
+                  f"{'rss(MB)':>10}{'rows':>12}{'rounds':>9}")
+        print("=" * len(header))
+        print(header)
+        print("-" * len(header))
+        for s in summary:
+            name = "  " * s["depth"] + s["stage"]
+            print(f"{name:<28}{s['calls']:>7}{s['wall_time_s']:>10.2f}{100 * s['wall_time_s'] / total_wall:>7.1f}"
+                  f"{s['cpu_time_s']:>10.2f}{s['peak_rss_mb']:>10.1f}{s['rows']:>12}{s['boosting_rounds']:>9}")
+        print("=" * len(header))
+        if self.run_log_path:
+            print(f"[INFO] 執行紀錄已輸出到 {self.run_log_path}")
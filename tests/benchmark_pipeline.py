@@ -0,0 +1,246 @@
+import argparse, json, os, platform, shutil, subprocess, sys, tempfile, time
+from datetime import datetime
+
+import numpy as np
+import yaml
+from sklearn.model_selection import train_test_split
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_root, "src"))
+
+# === 匯入自訂模組 ===
+from data.synthetic import write_synthetic_data
+from data.load_data import load_transaction_data, load_alert_data
+from data.labeling import create_labels
+from features.build_features import build_account_features
+from preprocessing.pipeline import build_preprocessing_pipeline
+from utils.class_weights import compute_scale_pos_weight
+from optimization.fitness import fitness_function, N_ESTIMATORS, N_SPLITS
+from models.train import train_xgb
+from evaluation.diagnose_feature import diagnose_features
+from predict.predict import run_prediction
+from utils.instrumentation import RunTracker
+
+'''
+Pipeline 各階段效能量測 (benchmark)
+
+- 以合成資料 (src/data/synthetic.py) 執行 train.py 的主要階段，不需要比賽原始資料。
+- 每個階段以 RunTracker (src/utils/instrumentation.py) 記錄 wall time、CPU time、peak RSS 與處理筆數。
+- 結果輸出成 JSON (outputs/benchmarks/)，檔名含 git commit，可用 --compare 與前一次結果比較。
+
+使用方式：
+    python tests/benchmark_pipeline.py --scale small
+    python tests/benchmark_pipeline.py --scale medium --compare outputs/benchmarks/<前一次結果>.json
+'''
+
+SCALES = {
+    "small": {"n_accounts": 5000, "txn_per_account": 5.0},
+    "medium": {"n_accounts": 100000, "txn_per_account": 5.0},
+    "full": {"n_accounts": 1000000, "txn_per_account": 5.0},
+}
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_benchmark(args, config, work_dir: str, report: dict):
+    """
+    以合成資料執行各階段並把結果寫入 report（meta / stages）。
+    report["stages"] 直接指向 RunTracker 的紀錄，發生例外時仍保留已完成（含失敗）的階段，例外會往外拋出。
+    """
+    data_params = dict(SCALES[args.scale])
+    if args.n_accounts is not None:
+        data_params["n_accounts"] = args.n_accounts
+    if args.txn_per_account is not None:
+        data_params["txn_per_account"] = args.txn_per_account
+    data_params["alert_ratio"] = args.alert_ratio
+    data_params["random_state"] = args.seed
+
+    gen_start = time.perf_counter()
+    paths = write_synthetic_data(os.path.join(work_dir, "data_set"), **data_params)
+    generate_time = time.perf_counter() - gen_start
+
+    tracker = RunTracker(work_dir)
+    report["stages"] = tracker.records
+    report["meta"] = {
+        "git_commit": _git_commit(),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "scale": args.scale,
+        "data_params": data_params,
+        "n_estimators": args.n_estimators,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "generate_time_s": round(generate_time, 4),
+    }
+
+    # 階段名稱與切分方式與 src/train.py 相同，run log 與 benchmark JSON 可逐階段比較
+    print("[INFO] Benchmark 階段: load_data")
+    with tracker.stage("load_data") as record:
+        txn_df = load_transaction_data(paths["acct_transaction_csv"])
+        alert_df = load_alert_data(paths["acct_alert_csv"])
+        record["rows"] = len(txn_df)
+
+    print("[INFO] Benchmark 階段: build_account_features")
+    with tracker.stage("build_account_features", rows=len(txn_df)):
+        acct_features = build_account_features(txn_df)
+
+    print("[INFO] Benchmark 階段: create_labels")
+    with tracker.stage("create_labels", rows=len(acct_features)):
+        acct_features = create_labels(acct_features, alert_df)
+
+    X = acct_features.drop(columns=["acct", "label"])
+    y = acct_features["label"]
+
+    print("[INFO] Benchmark 階段: split")
+    with tracker.stage("split", rows=len(X)):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+
+    print("[INFO] Benchmark 階段: preprocessing")
+    with tracker.stage("preprocessing", rows=len(X)):
+        pipeline = build_preprocessing_pipeline(X.columns.tolist())
+        X_train_processed = pipeline.fit_transform(X_train)
+        X_test_processed = pipeline.transform(X_test)
+    scale_pos_weight = compute_scale_pos_weight(y_train)
+
+    # PSO 搜尋範圍的中點作為代表參數
+    bounds = np.array(config["pso"]["bounds"])
+    mid_params = bounds.mean(axis=1)
+    print("[INFO] Benchmark 階段: fitness_function")
+    with tracker.stage("fitness_function", rows=len(y_train), boosting_rounds=N_ESTIMATORS * N_SPLITS):
+        fitness_function(mid_params, X_train_processed, y_train, scale_pos_weight)
+
+    model_config = config["model"]
+    params = {
+        "scale_pos_weight": scale_pos_weight,
+        "max_depth": int(mid_params[0]),
+        "learning_rate": mid_params[1],
+        "subsample": mid_params[2],
+        "colsample_bytree": mid_params[3],
+        "reg_lambda": mid_params[4],
+        "reg_alpha": mid_params[5],
+        "n_estimators": args.n_estimators,
+        "early_stopping_rounds": model_config["early_stopping_rounds"],
+        "eval_metric": model_config["eval_metric"],
+        "objective": model_config["objective"],
+        "device": model_config["device"],
+        "random_state": model_config["random_state"],
+        "n_jobs": model_config["n_jobs"],
+    }
+    print("[INFO] Benchmark 階段: train_xgb")
+    with tracker.stage("train_xgb", rows=len(y_train)) as record:
+        model = train_xgb(X_train_processed, y_train, X_test_processed, y_test, params,
+                          output_dir=os.path.join(work_dir, "model_plots"))
+        record["boosting_rounds"] = model.get_booster().num_boosted_rounds()
+
+    diag_config = config.get("diagnostics", {})
+    print("[INFO] Benchmark 階段: diagnose_features")
+    with tracker.stage("diagnose_features", rows=len(X_train)):
+        diagnose_features(
+            X_train, X_test, y_train, y_test, model,
+            output_dir=os.path.join(work_dir, "feature_plots"),
+            summary_csv=os.path.join(work_dir, "feature_diagnosis_summary.csv"),
+            sample_size=diag_config.get("sample_size"),
+            shap_sample_size=diag_config.get("shap_sample_size"),
+            plot_workers=diag_config.get("plot_workers", 1),
+            skip_plots=diag_config.get("skip_plots", False)
+        )
+
+    print("[INFO] Benchmark 階段: run_prediction")
+    with tracker.stage("run_prediction", rows=len(acct_features)):
+        run_prediction(model, pipeline, acct_features, paths["acct_predict_csv"],
+                       os.path.join(work_dir, "acct_predict_result.csv"))
+
+def _total_cpu(stage: dict) -> float:
+    """階段 CPU time（含子 process），與 RunTracker.summarize() 的計算方式相同"""
+    return stage["cpu_time_s"] + stage.get("child_cpu_time_s", 0.0)
+
+def _ratio(current: float, base: float) -> float:
+    return current / base if base > 0 else float("nan")
+
+def print_summary(report: dict, baseline: dict = None):
+    """印出各階段結果；提供 baseline 時一併顯示與前一次結果的比值 (wall / cpu / rss)"""
+    baseline_stages = {s["stage"]: s for s in baseline["stages"]} if baseline else {}
+    header = f"{'stage':<24}{'rows':>10}{'wall(s)':>10}{'cpu(s)':>10}{'rss(MB)':>10}"
+    if baseline:
+        header += f"{'wall x':>9}{'cpu x':>9}{'rss x':>9}"
+    print("=" * len(header))
+    print(header)
+    print("-" * len(header))
+    for s in report["stages"]:
+        # 階段在設定 rows 之前失敗時 rows 為 None
+        rows = s.get("rows")
+        rows = "-" if rows is None else rows
+        line = f"{s['stage']:<24}{rows:>10}{s['wall_time_s']:>10.2f}{_total_cpu(s):>10.2f}{s['peak_rss_mb']:>10.1f}"
+        base = baseline_stages.get(s["stage"])
+        if base:
+            line += (f"{_ratio(s['wall_time_s'], base['wall_time_s']):>9.2f}"
+                     f"{_ratio(_total_cpu(s), _total_cpu(base)):>9.2f}"
+                     f"{_ratio(s['peak_rss_mb'], base['peak_rss_mb']):>9.2f}")
+        if s["status"] != "ok":
+            line += "  ❌"
+        print(line)
+    print("=" * len(header))
+    if report["status"] != "ok":
+        print(f"[ERROR] Benchmark 失敗：{report['error']}")
+    if baseline:
+        print(f"[INFO] 比較基準: commit {baseline['meta']['git_commit']} ({baseline['meta'].get('timestamp', 'unknown')})")
+
+def write_report(args, report: dict):
+    """輸出 benchmark JSON 並印出總表"""
+    output_dir = os.path.join(project_root, args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_json = os.path.join(output_dir, f"benchmark_{args.scale}_{report['meta']['git_commit']}_{timestamp}.json")
+    with open(output_json, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(report, baseline)
+    print(f"[INFO] Benchmark 結果已輸出到 {output_json}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="configs/config.yaml", help="Path to config file")
+    parser.add_argument("--scale", default="small", choices=sorted(SCALES), help="合成資料規模")
+    parser.add_argument("--n-accounts", type=int, default=None, help="覆寫帳戶數")
+    parser.add_argument("--txn-per-account", type=float, default=None, help="覆寫每個帳戶平均交易筆數")
+    parser.add_argument("--alert-ratio", type=float, default=0.005, help="警示帳戶比例")
+    parser.add_argument("--n-estimators", type=int, default=200, help="train_xgb 的 n_estimators")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", default="outputs/benchmarks", help="JSON 結果輸出目錄")
+    parser.add_argument("--compare", default=None, help="前一次 benchmark JSON，用於比較")
+    parser.add_argument("--keep-data", action="store_true", help="保留合成資料與輸出圖表（預設執行結束後刪除）")
+    args = parser.parse_args()
+
+    with open(os.path.join(project_root, args.config), "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    report = {"meta": {"git_commit": _git_commit()}, "stages": [], "status": "ok"}
+    work_dir = tempfile.mkdtemp(prefix="aml_benchmark_")
+    try:
+        try:
+            run_benchmark(args, config, work_dir, report)
+        except BaseException as e:
+            # 記錄錯誤後繼續往外拋出，讓 process 以非 0 結束；finally 中仍會輸出部分結果
+            report["status"] = "error"
+            report["error"] = repr(e)
+            raise
+        finally:
+            write_report(args, report)
+    finally:
+        # 與輸出結果分開，輸出結果時出錯也一定會清除暫存資料
+        if args.keep_data:
+            print(f"[INFO] 合成資料與輸出保留於 {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()